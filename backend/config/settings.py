@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'journal',
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
 ]
 
 MIDDLEWARE = [
@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
+import logging
+
+logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
@@ -22,61 +26,71 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         username_or_email = attrs.get('username_or_email')
         password = attrs.get('password')
 
-        print(f"[Auth] Login attempt - Email: {email}, Username: {username}, UsernameOrEmail: {username_or_email}")
+        logger.debug(
+            "Login attempt email=%s username=%s username_or_email=%s",
+            email, username, username_or_email
+        )
 
         # Check if we have the required fields
         if not password or (not email and not username and not username_or_email):
             error_msg = 'Please provide both username/email and password'
-            print(f"[Auth] Validation error: {error_msg}")
+            logger.warning("Login validation error: %s", error_msg)
             raise ValidationError(error_msg)
 
+        # Determine the lookup field and value
+        if email:
+            lookup = {'email__iexact': email}
+        elif username:
+            lookup = {'username__iexact': username}
+        else:  # username_or_email
+            if '@' in username_or_email:
+                lookup = {'email__iexact': username_or_email}
+            else:
+                lookup = {'username__iexact': username_or_email}
+
         try:
-            # Determine the lookup field and value
-            if email:
-                lookup = {'email__iexact': email}
-            elif username:
-                lookup = {'username__iexact': username}
-            else:  # username_or_email
-                if '@' in username_or_email:
-                    lookup = {'email__iexact': username_or_email}
-                else:
-                    lookup = {'username__iexact': username_or_email}
+            try:
+                # Fetch only the columns needed to authenticate and issue tokens
+                user = User.objects.only(
+                    'id', 'username', 'email', 'password', 'is_active', 'is_staff', 'date_joined'
+                ).get(**lookup)
+            except User.DoesNotExist:
+                user = None
+                logger.warning("Login failed: no account found with %s", lookup)
 
-            user = User.objects.get(**lookup)
-            print(f"[Auth] Found user: {user.username} (ID: {user.id})")
+            if user is not None:
+                password_ok = user.check_password(password)
+            else:
+                # Hash the password anyway so a missing account takes as long as a wrong password
+                make_password(password)
+                password_ok = False
+        except Exception as e:
+            logger.error("Unexpected error during login: %s", e, exc_info=True)
+            raise ValidationError('An error occurred during login')
 
-            if not user.check_password(password):
-                error_msg = 'Invalid password'
-                print(f"[Auth] {error_msg} for user: {user.username}")
-                raise ValidationError('Invalid username/email or password')
+        # A missing account leaves password_ok False, so both failures raise here
+        if not password_ok:
+            if user is not None:
+                logger.warning("Login failed: invalid password for user %s", user.username)
+            raise ValidationError('Invalid username/email or password')
 
-            if not user.is_active:
-                error_msg = 'Account is inactive'
-                print(f"[Auth] {error_msg} for user: {user.username}")
-                raise ValidationError('This account is inactive')
+        if not user.is_active:
+            logger.warning("Login failed: account is inactive for user %s", user.username)
+            raise ValidationError('This account is inactive')
 
-            refresh = self.get_token(user)
-            print(f"[Auth] Login successful for user: {user.username}")
+        refresh = self.get_token(user)
 
-            return {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-                'user': {
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'is_staff': user.is_staff,
-                    'date_joined': user.date_joined.isoformat() if user.date_joined else None,
-                }
+        return {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': {
+                'id': user.id,
+                'username': user.username,
+                'email': user.email,
+                'is_staff': user.is_staff,
+                'date_joined': user.date_joined.isoformat() if user.date_joined else None,
             }
-            
-        except User.DoesNotExist:
-            error_msg = f'No account found with {lookup}: {username_or_email}'
-            print(f"[Auth] {error_msg}")
-            raise ValidationError('Invalid username/email or password')
-        except Exception as e:
-            print(f"[Auth] Unexpected error during login: {str(e)}")
-            raise ValidationError('An error occurred during login')
+        }
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
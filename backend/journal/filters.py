@@ -0,0 +1,15 @@
+import django_filters
+from .models import JournalEntry
+
+
+class JournalEntryFilter(django_filters.FilterSet):
+    """Filter journal entries by mood, entry type and creation date range."""
+    # Plain exact matches, so an unknown value yields no results rather than a 400
+    mood = django_filters.CharFilter(field_name='mood')
+    entry_type = django_filters.CharFilter(field_name='entry_type')
+    start_date = django_filters.DateFilter(field_name='created_at', lookup_expr='date__gte')
+    end_date = django_filters.DateFilter(field_name='created_at', lookup_expr='date__lte')
+
+    class Meta:
+        model = JournalEntry
+        fields = ['mood', 'entry_type', 'start_date', 'end_date']
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.24 on 2026-10-14 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0003_conversation_message'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-updated_at'], name='journal_con_user_id_c3762b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'created_at'], name='journal_mes_convers_a60857_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.24 on 2026-10-14 19:14
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0004_conversation_message_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='user_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('username'), name='user_username_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.24 on 2026-10-14 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0005_user_case_insensitive_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalentry',
+            index=models.Index(fields=['user', '-created_at'], name='journal_jou_user_id_1ad335_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r'\S+')
+
+
+def backfill_word_count(apps, schema_editor):
+    JournalEntry = apps.get_model('journal', 'JournalEntry')
+    entries = JournalEntry.objects.only('id', 'content').order_by('pk')
+    batch = []
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        entry.word_count = sum(1 for _ in _WORD_RE.finditer(entry.content))
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            JournalEntry.objects.bulk_update(batch, ['word_count'])
+            batch = []
+    if batch:
+        JournalEntry.objects.bulk_update(batch, ['word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journal', '0006_journalentry_user_created_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_word_count, migrations.RunPython.noop),
+    ]
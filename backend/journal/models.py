@@ -1,9 +1,14 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+import re
 import uuid
 
+# Matches a single whitespace-delimited word
+_WORD_RE = re.compile(r'\S+')
+
 class UserManager(BaseUserManager):
     """Custom user model manager where email is the unique identifier"""
     def create_user(self, username, email, password=None, **extra_fields):
@@ -38,6 +43,13 @@ class User(AbstractUser):
     
     objects = UserManager()
     
+    class Meta(AbstractUser.Meta):
+        # Case-insensitive login lookups (iexact) compare UPPER() values
+        indexes = [
+            models.Index(Upper('email'), name='user_email_upper_idx'),
+            models.Index(Upper('username'), name='user_username_upper_idx'),
+        ]
+    
     def __str__(self):
         return self.email
 
@@ -77,9 +89,49 @@ class JournalEntry(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Journal Entries'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
         
     def __str__(self):
         return f"{self.user.username}'s entry on {self.created_at.strftime('%Y-%m-%d')}"
+    
+    @staticmethod
+    def count_words(content):
+        """Count whitespace-delimited words without building a token list."""
+        return sum(1 for _ in _WORD_RE.finditer(content))
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored content so save() can tell whether it changed
+        instance._loaded_content = instance.__dict__.get('content')
+        return instance
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Forward everything, since the signature grows across Django versions
+        fields = kwargs.get('fields', args[1] if len(args) > 1 else None)
+        # Re-snapshot whenever the stored content was reloaded
+        if fields is None or 'content' in fields:
+            self._loaded_content = self.__dict__.get('content')
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # A save restricted to other columns leaves the stored content as it was
+        writes_content = update_fields is None or 'content' in update_fields
+        content_changed = (
+            writes_content
+            and 'content' not in self.get_deferred_fields()
+            and self.content != getattr(self, '_loaded_content', None)
+        )
+        if content_changed:
+            self.word_count = self.count_words(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'word_count'}
+        super().save(*args, **kwargs)
+        if writes_content:
+            self._loaded_content = self.__dict__.get('content')
 
 
 class Conversation(models.Model):
@@ -93,17 +145,31 @@ class Conversation(models.Model):
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at']),
+        ]
         
     def __str__(self):
         return f"{self.title or 'Untitled'} - {self.user.username}"
     
     def save(self, *args, **kwargs):
-        if not self.title and hasattr(self, 'messages'):
-            # Auto-generate title from first message if not provided
-            first_msg = self.messages.first()
+        # Unsaved conversations can't have messages yet. Check _state rather than pk,
+        # since the UUID primary key is assigned before the first save.
+        if not self.title and not self._state.adding:
+            # Auto-generate title from first message if not provided. Load conversation_id
+            # too, or attaching self to the fetched message refetches that deferred column.
+            first_msg = self.messages.order_by('created_at').only('content', 'conversation_id').first()
             if first_msg:
                 self.title = first_msg.content[:50] + ('...' if len(first_msg.content) > 50 else '')
         super().save(*args, **kwargs)
+    
+    def touch(self):
+        """Bump updated_at after a new message, titling the conversation if it has no title."""
+        if self.title:
+            Conversation.objects.filter(pk=self.pk).update(updated_at=timezone.now())
+        else:
+            # Let save() derive a title from the first message
+            self.save(update_fields=['title', 'updated_at'])
 
 
 class Message(models.Model):
@@ -123,6 +189,9 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at']),
+        ]
         
     def __str__(self):
         return f"{self.role}: {self.content[:30]}..."
\ No newline at end of file
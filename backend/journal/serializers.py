@@ -8,11 +8,22 @@ from typing import Optional, Dict, List, Any
 
 User = get_user_model()
 
+# Validator building blocks shared by every UserSerializer instance
+_USER_QS = User.objects.all()
+_USERNAME_REGEX = RegexValidator(
+    regex=r'^[\w.@+-]+$',
+    message='Enter a valid username. This value may contain only letters, numbers, and @/./+/-/_ characters.'
+)
+
+# Allowed choice values, built once at import for O(1) membership checks
+_VALID_MOODS = frozenset(choice[0] for choice in JournalEntry.MOOD_CHOICES)
+_VALID_ENTRY_TYPES = frozenset(choice[0] for choice in JournalEntry.ENTRY_TYPES)
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         required=True,
         validators=[UniqueValidator(
-            queryset=User.objects.all(),
+            queryset=_USER_QS,
             message='A user with this email already exists.'
         )]
     )
@@ -21,13 +32,10 @@ class UserSerializer(serializers.ModelSerializer):
         max_length=150,
         validators=[
             UniqueValidator(
-                queryset=User.objects.all(),
+                queryset=_USER_QS,
                 message='A user with this username already exists.'
             ),
-            RegexValidator(
-                regex='^[\w.@+-]+$',
-                message='Enter a valid username. This value may contain only letters, numbers, and @/./+/-/_ characters.'
-            )
+            _USERNAME_REGEX
         ]
     )
     password = serializers.CharField(
@@ -90,7 +98,7 @@ class MessageSerializer(serializers.ModelSerializer):
 
 class ConversationListSerializer(serializers.ModelSerializer):
     """Serializer for listing conversations with basic info."""
-    message_count = serializers.IntegerField(source='messages.count', read_only=True)
+    message_count = serializers.IntegerField(read_only=True)
     last_message = serializers.SerializerMethodField()
     
     class Meta:
@@ -99,7 +107,8 @@ class ConversationListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'message_count', 'last_message']
     
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
+        # ConversationViewSet.get_queryset prefetches just the latest message
+        last_msg = obj._prefetched_messages[0] if obj._prefetched_messages else None
         if last_msg:
             return {
                 'content': last_msg.content[:100] + ('...' if len(last_msg.content) > 100 else ''),
@@ -129,6 +138,26 @@ class ConversationSerializer(serializers.Serializer):
     class Meta:
         fields = ['message']
 
+class JournalEntryListSerializer(serializers.ListSerializer):
+    """Creates several journal entries with a single bulk INSERT."""
+    
+    def __init__(self, *args, **kwargs):
+        # An empty batch is a client error, not a no-op create
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
+    
+    def create(self, validated_data):
+        user = self.context['request'].user
+        entries = [
+            JournalEntry(
+                **{**attrs, 'user': user, 'tags': attrs.get('tags') or []},
+                # bulk_create skips save(), so derive word_count here
+                word_count=JournalEntry.count_words(attrs['content'])
+            )
+            for attrs in validated_data
+        ]
+        return JournalEntry.objects.bulk_create(entries, batch_size=500)
+
 class JournalEntrySerializer(serializers.ModelSerializer):
     """Serializer for JournalEntry model with validation and custom methods."""
     
@@ -151,18 +180,17 @@ class JournalEntrySerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'is_private', 'tags',
             'word_count', 'sentiment_score'
         ]
+        list_serializer_class = JournalEntryListSerializer
     
     def validate_mood(self, value):
         """Validate that mood is one of the allowed choices."""
-        valid_moods = [choice[0] for choice in JournalEntry.MOOD_CHOICES]
-        if value not in valid_moods:
+        if value not in _VALID_MOODS:
             raise serializers.ValidationError("Invalid mood selection.")
         return value
     
     def validate_entry_type(self, value):
         """Validate that entry_type is one of the allowed choices."""
-        valid_types = [choice[0] for choice in JournalEntry.ENTRY_TYPES]
-        if value not in valid_types:
+        if value not in _VALID_ENTRY_TYPES:
             raise serializers.ValidationError("Invalid entry type.")
         return value
     
@@ -170,6 +198,7 @@ class JournalEntrySerializer(serializers.ModelSerializer):
         """Create a new journal entry with the current user."""
         # Ensure the current user is set as the entry's user
         validated_data['user'] = self.context['request'].user
+        validated_data['tags'] = validated_data.get('tags') or []
         return super().create(validated_data)
     
     def update(self, instance, validated_data):
@@ -178,5 +207,10 @@ class JournalEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at', 'word_count', 'sentiment_score']
         for field in read_only_fields:
             validated_data.pop(field, None)
-            
-        return super().update(instance, validated_data)
\ No newline at end of file
+        
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        
+        # Only write the submitted columns; save() adds word_count if content changed
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
\ No newline at end of file
@@ -1,41 +1,65 @@
 """
 LLM Service implementation for local language model interactions.
 Handles conversation management and model interactions via Ollama.
+Conversation history is stored in the database as Message rows.
 """
 import os
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import requests
 from dotenv import load_dotenv
+from ...models import Message
 
 load_dotenv()
 
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a supportive, empathetic AI therapist. Your role is to help users "
+    "reflect on their thoughts and feelings in a non-judgmental way. Ask open-ended "
+    "questions and provide thoughtful responses based on their journal entries."
+)
+
+# Number of most recent messages sent to the model with each prompt
+HISTORY_WINDOW = 20
+
+# (base_url, model_name) pairs already verified by this process
+_checked_models: Set[Tuple[str, str]] = set()
+
 class LLMService:
     """Service for interacting with local LLM via Ollama."""
     
-    def __init__(self, model_name: str = "phi3"):
+    def __init__(self, model_name: str = "phi3", system_prompt: Optional[str] = None):
         """Initialize the LLM service with a specific model.
         
         Args:
             model_name: Name of the Ollama model to use (default: phi3)
+            system_prompt: Optional system prompt to prefix every conversation with
         """
         self.base_url = os.getenv("OLLAMA_API_URL", "http://localhost:11434")
         self.model_name = model_name
-        self.conversations: Dict[str, List[Dict]] = {}
+        self.system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+        # Reuse one connection pool for all requests to Ollama
+        self.session = requests.Session()
         self._ensure_model_available()
     
     def _ensure_model_available(self):
-        """Ensure the specified model is available, pull if necessary."""
+        """Ensure the specified model is available, pull if necessary.
+        
+        The check runs once per (base_url, model_name) per process.
+        """
+        key = (self.base_url, self.model_name)
+        if key in _checked_models:
+            return
+        
         try:
             # Check if Ollama server is reachable
-            version_response = requests.get(f"{self.base_url}/api/version")
+            version_response = self.session.get(f"{self.base_url}/api/version")
             if version_response.status_code != 200:
                 raise RuntimeError(f"Ollama server returned status {version_response.status_code}")
                 
             print(f"Connected to Ollama server (Version: {version_response.text.strip()})")
             
             # Check if model is available
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self.session.get(f"{self.base_url}/api/tags")
             if response.status_code != 200:
                 raise RuntimeError(f"Failed to list models: {response.text}")
                 
@@ -47,6 +71,8 @@ class LLMService:
                 if self.model_name not in models:
                     print(f"Model {self.model_name} not found. Pulling from Ollama...")
                     self._pull_model()
+                
+                _checked_models.add(key)
                     
             except ValueError as e:
                 print(f"Unexpected response format: {response.text}")
@@ -61,108 +87,135 @@ class LLMService:
     def _pull_model(self):
         """Pull the specified model from Ollama."""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/pull",
                 json={"name": self.model_name},
                 stream=True
             )
             response.raise_for_status()
             
-            # Stream the download progress
-            for line in response.iter_lines():
-                if line:
-                    status = json.loads(line)
-                    if "status" in status:
-                        print(status["status"])
+            # Stream the download progress, reading large chunks and reporting
+            # at most once per percent so stdout doesn't throttle the download
+            last_status = None
+            last_percent = -1
+            for line in response.iter_lines(chunk_size=65536):
+                if not line:
+                    continue
+                status = json.loads(line)
+                if "status" not in status:
+                    continue
+                
+                total = status.get("total")
+                if total:
+                    percent = status.get("completed", 0) * 100 // total
+                    if status["status"] == last_status and percent == last_percent:
+                        continue
+                    print(f"{status['status']}: {percent}%")
+                    last_percent = percent
+                elif status["status"] != last_status:
+                    print(status["status"])
+                last_status = status["status"]
                         
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to pull model {self.model_name}") from e
     
-    def start_conversation(self, user_id: str, system_prompt: Optional[str] = None) -> str:
-        """Start a new conversation.
+    def _stream_chat(self, messages: List[Dict]) -> Iterator[str]:
+        """Stream the model's reply to a chat, one content chunk at a time.
         
         Args:
-            user_id: Unique identifier for the user
-            system_prompt: Optional system prompt to initialize the conversation
+            messages: Chat messages to send to the model
             
-        Returns:
-            str: The initial response from the model
+        Yields:
+            str: Pieces of the assistant's response as Ollama produces them
         """
-        if not system_prompt:
-            system_prompt = (
-                "You are a supportive, empathetic AI therapist. Your role is to help users "
-                "reflect on their thoughts and feelings in a non-judgmental way. Ask open-ended "
-                "questions and provide thoughtful responses based on their journal entries."
-            )
-        
-        self.conversations[user_id] = [
-            {"role": "system", "content": system_prompt}
-        ]
-        
-        return "Hello! I'm here to help you reflect on your thoughts and feelings. " \
-               "How can I assist you today?"
+        with self.session.post(
+            f"{self.base_url}/api/chat",
+            json={
+                "model": self.model_name,
+                "messages": messages,
+                "stream": True
+            },
+            stream=True,
+            timeout=60  # 60 second timeout
+        ) as response:
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Failed to get response from model: {chunk['error']}")
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    yield content
+                if chunk.get("done"):
+                    break
+    
+    def _load_history(self, conversation_id: str) -> List[Dict]:
+        """Load the most recent messages of a conversation, oldest first."""
+        # Read plain tuples rather than Message instances; they are only turned into chat dicts
+        recent = list(
+            Message.objects.filter(conversation_id=conversation_id)
+            .exclude(role='system')
+            .order_by('-created_at')
+            .values_list('role', 'content')[:HISTORY_WINDOW]
+        )
+        return [{"role": role, "content": content} for role, content in reversed(recent)]
     
     def continue_conversation(
         self, 
-        user_id: str, 
+        conversation_id: str, 
         message: str, 
         context: Optional[str] = None
     ) -> str:
         """Continue an existing conversation.
         
+        The user's message and the model's response are saved as Message rows.
+        
         Args:
-            user_id: Unique identifier for the user
+            conversation_id: ID of the Conversation to continue
             message: User's message
             context: Additional context (e.g., recent journal entries)
             
         Returns:
             str: The model's response
         """
-        if user_id not in self.conversations:
-            self.start_conversation(user_id)
-        
-        # Add user message to conversation history
-        self.conversations[user_id].append({"role": "user", "content": message})
+        user_message = Message(conversation_id=conversation_id, role='user', content=message)
         
-        # Prepare the prompt with context if provided
-        messages = self.conversations[user_id].copy()
-        
-        if context:
-            # Insert context after system message
-            messages.insert(1, {"role": "system", "content": f"Context from user's journal: {context}"})
+        # Prepare the prompt in one allocation, with context right after the system message
+        context_messages = (
+            [{"role": "system", "content": f"Context from user's journal: {context}"}]
+            if context else []
+        )
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            *context_messages,
+            *self._load_history(conversation_id),
+            {"role": "user", "content": message},
+        ]
         
         try:
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model_name,
-                    "messages": messages,
-                    "stream": False
-                },
-                timeout=60  # 60 second timeout
-            )
-            response.raise_for_status()
-            
-            assistant_message = response.json()["message"]["content"]
-            
-            # Add assistant's response to conversation history
-            self.conversations[user_id].append({"role": "assistant", "content": assistant_message})
-            
-            return assistant_message
-            
+            assistant_message = "".join(self._stream_chat(messages))
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to get response from model: {str(e)}")
+        
+        # Save both turns of the exchange in a single query
+        Message.objects.bulk_create([
+            user_message,
+            Message(conversation_id=conversation_id, role='assistant', content=assistant_message),
+        ])
+        
+        return assistant_message
     
-    def end_conversation(self, user_id: str):
-        """End a conversation and clear its history."""
-        if user_id in self.conversations:
-            del self.conversations[user_id]
-    
-    def get_conversation_history(self, user_id: str) -> List[Dict]:
-        """Get the conversation history for a user."""
-        return self.conversations.get(user_id, [])
-    
-    def clear_conversation_history(self, user_id: str):
-        """Clear conversation history for a user."""
-        if user_id in self.conversations:
-            self.conversations[user_id] = self.conversations[user_id][:1]  # Keep only system message
+    @staticmethod
+    def get_conversation_history(conversation_id: str) -> List[Dict]:
+        """Get the full message history of a conversation.
+        
+        This only reads the database, so it needs no connection to Ollama.
+        """
+        return list(
+            Message.objects.filter(conversation_id=conversation_id)
+            .order_by('created_at')
+            .values('role', 'content')
+        )
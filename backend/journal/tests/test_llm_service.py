@@ -0,0 +1,184 @@
+import io
+from contextlib import redirect_stdout
+from datetime import timedelta
+from unittest import mock
+
+import requests
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from ..models import Conversation, Message
+from ..services.llm import LLMService
+from ..services.llm.llm_service import DEFAULT_SYSTEM_PROMPT, HISTORY_WINDOW, _checked_models
+
+User = get_user_model()
+
+
+def _chat_response(*lines):
+    """Build a stand-in for a streamed Ollama /api/chat response."""
+    response = mock.MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = list(lines)
+    return response
+
+
+class ContinueConversationTests(TestCase):
+    """Tests for LLMService.continue_conversation, with Ollama's replies canned."""
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='chatuser', email='chat@example.com')
+        cls.conversation = Conversation.objects.create(user=user, title='Chat')
+
+        # More history than the window holds, with a system message mixed in
+        now = timezone.now()
+        history = [
+            Message(
+                conversation=cls.conversation,
+                role='user' if n % 2 == 0 else 'assistant',
+                content=f'message {n}',
+                created_at=now - timedelta(minutes=30 - n)
+            )
+            for n in range(HISTORY_WINDOW + 4)
+        ]
+        history.append(Message(
+            conversation=cls.conversation,
+            role='system',
+            content='stored system note',
+            created_at=now - timedelta(minutes=1)
+        ))
+        Message.objects.bulk_create(history)
+
+    def setUp(self):
+        with mock.patch.object(LLMService, '_ensure_model_available'):
+            self.service = LLMService(model_name='phi3')
+        patcher = mock.patch.object(self.service.session, 'post')
+        self.mock_post = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sends_history_window_and_saves_exchange(self):
+        """Test the prompt layout and that both turns are stored."""
+        self.mock_post.return_value = _chat_response(
+            b'{"message": {"role": "assistant", "content": "How did "}, "done": false}',
+            b'',
+            b'{"message": {"role": "assistant", "content": "it go?"}, "done": true}',
+        )
+
+        reply = self.service.continue_conversation(
+            conversation_id=str(self.conversation.id),
+            message='I went for a walk.',
+            context='Felt calm today.'
+        )
+
+        self.assertEqual(reply, 'How did it go?')
+        payload = self.mock_post.call_args.kwargs['json']
+        self.assertEqual(payload['model'], 'phi3')
+        self.assertTrue(payload['stream'])
+
+        # System prompt, then journal context, then the newest non-system
+        # history oldest first, then the new message
+        expected_history = [
+            {'role': 'user' if n % 2 == 0 else 'assistant', 'content': f'message {n}'}
+            for n in range(4, HISTORY_WINDOW + 4)
+        ]
+        self.assertEqual(payload['messages'], [
+            {'role': 'system', 'content': DEFAULT_SYSTEM_PROMPT},
+            {'role': 'system', 'content': "Context from user's journal: Felt calm today."},
+            *expected_history,
+            {'role': 'user', 'content': 'I went for a walk.'},
+        ])
+
+        stored = list(
+            Message.objects.filter(conversation=self.conversation)
+            .order_by('-created_at')
+            .values_list('role', 'content')[:2]
+        )
+        self.assertEqual(stored, [
+            ('assistant', 'How did it go?'),
+            ('user', 'I went for a walk.'),
+        ])
+
+    def test_omits_context_message_without_context(self):
+        """Test that no context message is sent when there is no context."""
+        self.mock_post.return_value = _chat_response(
+            b'{"message": {"role": "assistant", "content": "Hello."}, "done": true}',
+        )
+
+        self.service.continue_conversation(
+            conversation_id=str(self.conversation.id),
+            message='Hi'
+        )
+
+        messages = self.mock_post.call_args.kwargs['json']['messages']
+        self.assertEqual(messages[0], {'role': 'system', 'content': DEFAULT_SYSTEM_PROMPT})
+        self.assertEqual(messages[1]['content'], 'message 4')
+        self.assertEqual(len(messages), HISTORY_WINDOW + 2)
+
+    def test_model_error_saves_nothing(self):
+        """Test that an error from the model is raised and no messages are stored."""
+        self.mock_post.return_value = _chat_response(b'{"error": "model not loaded"}')
+        before = Message.objects.count()
+
+        with self.assertRaisesMessage(RuntimeError, 'model not loaded'):
+            self.service.continue_conversation(
+                conversation_id=str(self.conversation.id),
+                message='Hi'
+            )
+
+        self.assertEqual(Message.objects.count(), before)
+
+
+class ModelAvailabilityTests(SimpleTestCase):
+    """Tests for the Ollama probe and model pull, with the HTTP calls stubbed."""
+    def setUp(self):
+        _checked_models.clear()
+        self.addCleanup(_checked_models.clear)
+
+    def test_probe_runs_once_per_process(self):
+        """Test that a second service reuses the first one's model check."""
+        version = mock.Mock(status_code=200, text='0.1.0')
+        tags = mock.Mock(status_code=200)
+        tags.json.return_value = {'models': [{'name': 'phi3'}]}
+
+        def get(url, *args, **kwargs):
+            return version if url.endswith('/api/version') else tags
+
+        with mock.patch.object(requests.Session, 'get', side_effect=get) as mock_get:
+            with redirect_stdout(io.StringIO()):
+                first = LLMService('phi3')
+                LLMService('phi3')
+
+        self.assertEqual(
+            [call.args[0] for call in mock_get.call_args_list],
+            [f'{first.base_url}/api/version', f'{first.base_url}/api/tags']
+        )
+
+    def test_pull_reports_each_status_and_percent_once(self):
+        """Test that repeated pull progress lines are printed only when they change."""
+        with mock.patch.object(LLMService, '_ensure_model_available'):
+            service = LLMService('phi3')
+        response = mock.Mock()
+        response.iter_lines.return_value = [
+            b'{"status": "pulling manifest"}',
+            b'{"status": "pulling manifest"}',
+            b'{"status": "downloading", "total": 200, "completed": 0}',
+            b'{"status": "downloading", "total": 200, "completed": 1}',
+            b'',
+            b'{"status": "downloading", "total": 200, "completed": 2}',
+            b'{"status": "downloading", "total": 200, "completed": 3}',
+            b'{"status": "verifying"}',
+            b'{"status": "success"}',
+        ]
+        stdout = io.StringIO()
+        with mock.patch.object(service.session, 'post', return_value=response):
+            with redirect_stdout(stdout):
+                service._pull_model()
+
+        self.assertEqual(stdout.getvalue().splitlines(), [
+            'pulling manifest',
+            'downloading: 0%',
+            'downloading: 1%',
+            'verifying',
+            'success',
+        ])
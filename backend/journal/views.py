@@ -14,17 +14,24 @@ from .serializers import (
     ConversationDetailSerializer,
     MessageSerializer
 )
+from .filters import JournalEntryFilter
 from .services.llm import LLMService
-from datetime import datetime, timedelta
+from datetime import timedelta
+from django.utils import timezone
+from functools import lru_cache
 
-# Initialize LLM service
-llm_service = LLMService(model_name="phi3")
+
+@lru_cache(maxsize=1)
+def get_llm_service():
+    """Return the shared LLM service, connecting to Ollama on first use."""
+    return LLMService(model_name="phi3")
 
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework import generics, filters
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Sum
-from datetime import datetime, timedelta
+from django.db.models import Q, Sum, Count, Prefetch, Value
+from django.db.models.functions import Coalesce
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
@@ -38,42 +45,29 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
     serializer_class = JournalEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_class = JournalEntryFilter
+    search_fields = ['title', 'content']
 
     def get_queryset(self):
         """
         This view should return a list of all journal entries
         for the currently authenticated user.
         """
-        queryset = JournalEntry.objects.filter(user=self.request.user)
-        
-        # Filter by date range
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-        if start_date and end_date:
-            queryset = queryset.filter(
-                created_at__date__range=[start_date, end_date]
-            )
-        
-        # Filter by mood
-        mood = self.request.query_params.get('mood')
-        if mood:
-            queryset = queryset.filter(mood=mood)
-        
-        # Filter by entry type
-        entry_type = self.request.query_params.get('entry_type')
-        if entry_type:
-            queryset = queryset.filter(entry_type=entry_type)
-        
-        # Search in title and content
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(content__icontains=search)
-            )
-        
-        # Order by most recent by default
-        return queryset.order_by('-created_at')
+        # Views are instantiated per request, so this is built once per request
+        # however many times DRF or the custom actions ask for it
+        if not hasattr(self, '_cached_qs'):
+            # Order by most recent by default
+            self._cached_qs = JournalEntry.objects.filter(
+                user=self.request.user
+            ).order_by('-created_at')
+        return self._cached_qs
+
+    def get_serializer(self, *args, **kwargs):
+        """Accept a list of entries on create and insert them in bulk."""
+        if self.action == 'create' and isinstance(self.request.data, list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         """Set the user to the current user when creating a new entry."""
@@ -105,32 +99,28 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
         """
         Delete a journal entry.
         Only the owner can delete their own entries.
-        Returns 204 if deleted, 404 if not found, 200 if already deleted.
+        Returns 204 if deleted or already gone, 404 if owned by another user.
         """
         entry_id = kwargs.get('pk')
         logger.info(f"DELETE request for entry {entry_id} from user {request.user.id}")
         
-        # First check if the entry exists and belongs to the user
-        entry_exists = self.get_queryset().filter(pk=entry_id).exists()
-        
-        if not entry_exists:
-            # Check if the entry exists at all (even if not owned by user)
-            entry_anywhere = JournalEntry.objects.filter(pk=entry_id).exists()
-            if not entry_anywhere:
-                logger.info(f"Entry {entry_id} not found, treating as success")
+        try:
+            # Delete in a single statement, scoped to the user's own entries
+            deleted, _ = JournalEntry.objects.filter(pk=entry_id, user=request.user).delete()
+            if deleted:
+                logger.info(f"Successfully deleted entry {entry_id}")
                 return Response(status=status.HTTP_204_NO_CONTENT)
-            else:
+            
+            # Nothing deleted: check if the entry exists at all (even if not owned by user)
+            if JournalEntry.objects.filter(pk=entry_id).exists():
                 logger.warning(f"Entry {entry_id} exists but not owned by user {request.user.id}")
                 return Response(
                     {"detail": "Not found."},
                     status=status.HTTP_404_NOT_FOUND
                 )
-        
-        try:
-            # If we get here, the entry exists and belongs to the user
-            response = super().destroy(request, *args, **kwargs)
-            logger.info(f"Successfully deleted entry {entry_id}")
-            return response
+            
+            logger.info(f"Entry {entry_id} not found, treating as success")
+            return Response(status=status.HTTP_204_NO_CONTENT)
             
         except Exception as e:
             logger.error(f"Error deleting entry {entry_id}: {str(e)}", exc_info=True)
@@ -138,16 +128,12 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
                 {"detail": "An error occurred while processing your request."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-            
-    def perform_destroy(self, instance):
-        """Perform the actual deletion of the instance."""
-        instance.delete()
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """Get recent journal entries (last 7 days)."""
-        recent_entries = self.get_queryset().filter(
-            created_at__gte=datetime.now() - timedelta(days=7)
+        recent_entries = self.filter_queryset(self.get_queryset()).filter(
+            created_at__gte=timezone.now() - timedelta(days=7)
         )
         page = self.paginate_queryset(recent_entries)
         if page is not None:
@@ -160,33 +146,35 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics about journal entries."""
-        from django.db.models import Count, Avg
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        # Get total entries and word count in a single query
+        totals = queryset.aggregate(
+            total_entries=Count('id'),
+            total_words=Coalesce(Sum('word_count'), Value(0))
+        )
         
         # Get mood distribution
-        mood_stats = (
-            self.get_queryset()
+        mood_stats = list(
+            queryset
             .values('mood')
             .annotate(count=Count('mood'))
             .order_by('-count')
         )
         
         # Get entry type distribution
-        type_stats = (
-            self.get_queryset()
+        type_stats = list(
+            queryset
             .values('entry_type')
             .annotate(count=Count('entry_type'))
             .order_by('-count')
         )
         
-        # Get total entries and word count
-        total_entries = self.get_queryset().count()
-        total_words = self.get_queryset().aggregate(Sum('word_count'))['word_count__sum'] or 0
-        
         return Response({
-            'total_entries': total_entries,
-            'total_words': total_words,
-            'mood_distribution': list(mood_stats),
-            'type_distribution': list(type_stats),
+            'total_entries': totals['total_entries'],
+            'total_words': totals['total_words'],
+            'mood_distribution': mood_stats,
+            'type_distribution': type_stats,
         })
 
 
@@ -212,10 +200,19 @@ class LLMConversationView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    def _active_conversation(self, user):
+        """Return the user's most recently updated unarchived conversation, if any."""
+        return Conversation.objects.filter(
+            user=user,
+            is_archived=False
+        ).order_by('-updated_at').first()
+
     def get(self, request):
         """Get conversation history."""
         try:
-            history = llm_service.get_conversation_history(str(request.user.id))
+            conversation = self._active_conversation(request.user)
+            # Reading history is a plain query; don't build the service or probe Ollama
+            history = LLMService.get_conversation_history(str(conversation.id)) if conversation else []
             return Response({"conversation": history}, status=status.HTTP_200_OK)
         except Exception as e:
             logging.error(f"Error getting conversation history: {str(e)}")
@@ -234,53 +231,32 @@ class LLMConversationView(APIView):
             message_content = serializer.validated_data['message']
             
             # Get or create conversation
-            conversation = Conversation.objects.filter(
-                user=request.user,
-                is_archived=False
-            ).order_by('-updated_at').first()
+            conversation = self._active_conversation(request.user)
             
             if not conversation:
                 # Create a new conversation if none exists
                 conversation = Conversation.objects.create(
                     user=request.user,
-                    title=f"Conversation {Conversation.objects.filter(user=request.user).count() + 1}"
+                    title=f"Conversation {timezone.now():%Y-%m-%d %H:%M}"
                 )
             
-            # Save user message
-            user_message = Message.objects.create(
-                conversation=conversation,
-                role='user',
-                content=message_content
-            )
-            
-            # Get recent journal entries for context (last 3 days)
-            recent_entries = JournalEntry.objects.filter(
+            # Get up to three recent journal entries for context (last 3 days)
+            recent_contents = JournalEntry.objects.filter(
                 user=request.user,
-                created_at__gte=datetime.now() - timedelta(days=3)
-            ).order_by('-created_at')
+                created_at__gte=timezone.now() - timedelta(days=3)
+            ).order_by('-created_at').values_list('content', flat=True)[:3]
             
-            context = "\n".join([entry.content for entry in recent_entries[:3]])
+            context = "\n".join(recent_contents)
             
-            # Start or continue conversation in LLM service
-            if not llm_service.get_conversation_history(str(request.user.id)):
-                llm_service.start_conversation(str(request.user.id))
-            
-            # Get response from LLM
-            response_content = llm_service.continue_conversation(
-                user_id=str(request.user.id),
+            # Get response from LLM; the service saves both messages
+            response_content = get_llm_service().continue_conversation(
+                conversation_id=str(conversation.id),
                 message=message_content,
                 context=context if context else None
             )
             
-            # Save bot response
-            bot_message = Message.objects.create(
-                conversation=conversation,
-                role='assistant',
-                content=response_content
-            )
-            
             # Update conversation's updated_at timestamp
-            conversation.save()
+            conversation.touch()
             
             return Response({"response": response_content}, status=status.HTTP_200_OK)
             
@@ -294,7 +270,12 @@ class LLMConversationView(APIView):
     def delete(self, request):
         """Clear conversation history."""
         try:
-            llm_service.clear_conversation_history(str(request.user.id))
+            # History lives in the database now; archive the active conversation
+            # so subsequent messages no longer continue it
+            conversation = self._active_conversation(request.user)
+            if conversation:
+                conversation.is_archived = True
+                conversation.save()
             return Response(
                 {"message": "Conversation history cleared"},
                 status=status.HTTP_200_OK
@@ -322,6 +303,32 @@ class ConversationViewSet(viewsets.ModelViewSet):
         """Return conversations for the current user."""
         queryset = Conversation.objects.filter(user=self.request.user)
         
+        if self.action == 'retrieve':
+            # The detail serializer inlines every message, so prefetch them in one query
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'messages',
+                    queryset=Message.objects.only(
+                        'id', 'role', 'content', 'created_at', 'metadata', 'conversation_id'
+                    )
+                )
+            )
+        elif self.action in ('list', 'update', 'partial_update'):
+            # Annotate the message count and prefetch only each conversation's
+            # latest message so the list serializer doesn't issue a COUNT and a
+            # SELECT per conversation
+            queryset = queryset.annotate(
+                message_count=Count('messages')
+            ).prefetch_related(
+                Prefetch(
+                    'messages',
+                    queryset=Message.objects.only(
+                        'id', 'role', 'content', 'created_at', 'conversation_id'
+                    ).order_by('-created_at')[:1],
+                    to_attr='_prefetched_messages'
+                )
+            )
+        
         # Filter by archived status if provided
         is_archived = self.request.query_params.get('archived')
         if is_archived is not None:
@@ -331,13 +338,17 @@ class ConversationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """Set the user to the current user when creating a conversation."""
-        serializer.save(user=self.request.user)
+        conversation = serializer.save(user=self.request.user)
+        
+        # A new conversation has no messages; mirror get_queryset's annotations
+        conversation.message_count = 0
+        conversation._prefetched_messages = []
     
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
         """Get messages for a specific conversation."""
         conversation = self.get_object()
-        messages = conversation.messages.all().order_by('created_at')
+        messages = conversation.messages.order_by('created_at')
         serializer = MessageSerializer(messages, many=True)
         return Response(serializer.data)
     
@@ -370,7 +381,7 @@ class MessageViewSet(viewsets.ModelViewSet):
         serializer.save(role='user', conversation=conversation)
         
         # Update conversation's updated_at timestamp
-        conversation.save()
+        conversation.touch()
 
 
 class RegisterView(APIView):
@@ -405,8 +416,14 @@ class RegisterView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
                 
-            # Check if email already exists
-            if User.objects.filter(email=email).exists():
+            # Check if email or username already exists in one query; at most two
+            # rows can match since both fields are unique
+            conflicts = list(
+                User.objects.filter(Q(email=email) | Q(username=username))
+                .values('email', 'username')[:2]
+            )
+            
+            if any(conflict['email'] == email for conflict in conflicts):
                 error_msg = 'A user with this email already exists.'
                 logger.warning(f"Email already exists: {email}")
                 return Response(
@@ -414,8 +431,7 @@ class RegisterView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
                 
-            # Check if username already exists
-            if User.objects.filter(username=username).exists():
+            if conflicts:
                 error_msg = 'A user with this username already exists.'
                 logger.warning(f"Username already exists: {username}")
                 return Response(
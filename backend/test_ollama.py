@@ -1,9 +1,14 @@
-import requests
+import io
 import json
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
 
-def test_ollama_connection():
-    base_url = "http://localhost:11434"
-    
+import requests
+
+BASE_URL = "http://localhost:11434"
+
+def check_ollama_connection(base_url=BASE_URL):
     try:
         # Test basic connectivity
         print("Testing Ollama connection...")
@@ -28,7 +33,40 @@ def test_ollama_connection():
     
     except requests.exceptions.RequestException as e:
         print(f"Error connecting to Ollama: {str(e)}")
-        print("Please ensure Ollama is running and accessible at http://localhost:11434")
+        print(f"Please ensure Ollama is running and accessible at {base_url}")
+
+
+class OllamaConnectionTests(unittest.TestCase):
+    """Exercise check_ollama_connection against stubbed Ollama responses."""
+
+    def _run_check(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            check_ollama_connection()
+        return output.getvalue()
+
+    @mock.patch('requests.get')
+    def test_lists_available_models(self, mock_get):
+        version_response = mock.Mock(status_code=200, text='0.1.0')
+        tags_response = mock.Mock(status_code=200, text='{"models": [...]}')
+        tags_response.json.return_value = {'models': [{'name': 'phi3', 'size': 2200}]}
+        mock_get.side_effect = [version_response, tags_response]
+
+        output = self._run_check()
+
+        mock_get.assert_has_calls([
+            mock.call(f"{BASE_URL}/api/version"),
+            mock.call(f"{BASE_URL}/api/tags"),
+        ])
+        self.assertIn("Ollama version: 0.1.0", output)
+        self.assertIn("- phi3 (size: 2200B)", output)
+
+    @mock.patch('requests.get', side_effect=requests.exceptions.ConnectionError('refused'))
+    def test_reports_unreachable_server(self, mock_get):
+        output = self._run_check()
+
+        self.assertIn("Error connecting to Ollama: refused", output)
+
 
 if __name__ == "__main__":
-    test_ollama_connection()
+    check_ollama_connection()